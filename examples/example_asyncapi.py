@@ -76,7 +76,7 @@ components:
 
 if __name__ == '__main__':
 
-    spec = yaml.load(EXAMPLE_YAML)
+    spec = yaml.safe_load(EXAMPLE_YAML)
 
     name = 'example'
 
@@ -93,7 +93,7 @@ if __name__ == '__main__':
         path = "{}#/components/messages/{}".format(name, msgName)
         generator.Generate(msg['payload'], path)
 
-    for schemaName, schema in spec['components']['schemas'].items():
-        path = "{}#/components/schemas/{}".format(name, schemaName)
-        generator.Generate(schema, path)
+    # Every schema in components/schemas is generated, spread across worker processes.
+    manifest = generator.GenerateAll(spec)
+    pprint(manifest)
 
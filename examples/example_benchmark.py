@@ -0,0 +1,108 @@
+import os
+import jsonschemacodegen.cpp as cpp
+from jsonschemacodegen.resolver import SimpleResolver
+
+# Generates C++ for a few schemas with the trusted_input option, and a benchmark.cpp that times
+# FromJson() against FromJsonUnchecked() for each of them.  Build and run it with:
+#   g++ -O2 -std=c++17 -I output/benchmark -I <rapidjson include dir> output/benchmark/*.cpp -o benchmark && ./benchmark
+# Adding -DJSON_SCHEMA_TRUSTED_INPUT makes FromJson() as fast as FromJsonUnchecked(), as every check is compiled out.
+
+SCHEMAS = {
+    "code": {
+        "type": "string",
+        "pattern": "^[A-Z]{3}-[0-9]{4}$",
+        "maxLength": 8,
+    },
+    "count": {
+        "type": "integer",
+        "minimum": 0,
+        "maximum": 1000,
+        "multipleOf": 5,
+    },
+    "ratio": {
+        "type": "number",
+        "minimum": 0,
+        "exclusiveMaximum": 1,
+    },
+    "tags": {
+        "type": "array",
+        "items": {"type": "string", "maxLength": 16},
+        "maxItems": 8,
+    },
+    "reading": {
+        "type": "object",
+        "properties": {
+            "code": {"$ref": "#/components/schemas/code"},
+            "count": {"$ref": "#/components/schemas/count"},
+            "ratio": {"$ref": "#/components/schemas/ratio"},
+            "tags": {"$ref": "#/components/schemas/tags"},
+        },
+        "required": ["code", "count"],
+        "additionalProperties": False,
+    },
+}
+
+INPUTS = [
+    ("Code", '"ABC-1234"'),
+    ("Count", '515'),
+    ("Ratio", '0.25'),
+    ("Tags", '["north", "outdoor", "roof"]'),
+    ("Reading", '{"code": "ABC-1234", "count": 515, "ratio": 0.25, "tags": ["north", "outdoor", "roof"]}'),
+]
+
+BENCHMARK_CPP = """#include <chrono>
+#include <iostream>
+#include <string>
+{includes}
+
+template <typename T>
+void Compare(const char* name, const char* text)
+{{
+    rapidjson::Document json;
+    json.Parse(text);
+    const int rounds = 200000;
+    const auto start = std::chrono::steady_clock::now();
+    for (int i = 0; i < rounds; i++)
+    {{
+        T value = T::FromJson(json);
+    }}
+    const auto checked = std::chrono::steady_clock::now();
+    for (int i = 0; i < rounds; i++)
+    {{
+        T value = T::FromJsonUnchecked(json);
+    }}
+    const auto unchecked = std::chrono::steady_clock::now();
+    std::cout << name
+        << ": FromJson " << std::chrono::duration<double, std::nano>(checked - start).count() / rounds << " ns"
+        << ", FromJsonUnchecked " << std::chrono::duration<double, std::nano>(unchecked - checked).count() / rounds << " ns"
+        << std::endl;
+}}
+
+int main()
+{{
+{comparisons}
+    return 0;
+}}
+"""
+
+if __name__ == '__main__':
+    output_dir = os.path.join("output", "benchmark")
+    os.makedirs(output_dir, exist_ok=True)
+    spec = {"components": {"schemas": SCHEMAS}}
+    resolver = SimpleResolver("benchmark", root=spec)
+    options = cpp.GeneratorOptions(trusted_input=True, unknown_members='schema')
+
+    cpp.LibraryGenerator(output_dir, output_dir, resolver, options=options).Generate()
+    generator = cpp.GeneratorFromSchema(src_output_dir=output_dir, header_output_dir=output_dir, resolver=resolver, options=options)
+    headers = []
+    for name, schema in SCHEMAS.items():
+        src, header = generator.Generate(schema, "#/components/schemas/{}".format(name), spec)
+        headers.append(header)
+
+    namespace = "::".join(resolver.cpp_get_namespace("#/components/schemas/reading"))
+    with open(os.path.join(output_dir, "benchmark.cpp"), "w") as fp:
+        fp.write(BENCHMARK_CPP.format(
+            includes="\n".join('#include "{}"'.format(h) for h in headers),
+            comparisons="\n".join('    Compare<{}::{}>("{}", R"({})");'.format(namespace, name, name, text) for name, text in INPUTS),
+        ))
+    print("Generated {} and benchmark.cpp in {}".format(", ".join(headers), output_dir))
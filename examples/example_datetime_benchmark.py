@@ -0,0 +1,101 @@
+import os
+import jsonschemacodegen.cpp as cpp
+from jsonschemacodegen.resolver import SimpleResolver
+
+# Generates C++ for a date-time schema, and a datetime_benchmark.cpp that times the generated class's parsing and
+# formatting against the boost::posix_time string conversions that date-time classes used before rfc3339.hpp.
+# Build and run it with:
+#   g++ -O2 -std=c++17 -I output/datetime_benchmark -I <rapidjson include dir> output/datetime_benchmark/*.cpp -o datetime_benchmark && ./datetime_benchmark
+
+SCHEMAS = {
+    "sentAt": {
+        "type": "string",
+        "format": "date-time",
+    },
+}
+
+INPUTS = [
+    "2020-01-02T03:04:05",
+    "2020-01-02T03:04:05.123456",
+]
+
+BENCHMARK_CPP = """#include <chrono>
+#include <iostream>
+#include <string>
+#include <boost/algorithm/string/replace.hpp>
+#include <boost/date_time/posix_time/posix_time.hpp>
+{includes}
+
+// The conversions that the generated date-time classes made before they used rfc3339.hpp.
+boost::posix_time::ptime BoostParse(const std::string& value)
+{{
+    return boost::posix_time::time_from_string(boost::replace_nth_copy(value, "T", 0, " "));
+}}
+
+std::string BoostFormat(const boost::posix_time::ptime& time)
+{{
+    return boost::posix_time::to_iso_extended_string(time);
+}}
+
+template <typename Function>
+double NanosecondsPerCall(Function function)
+{{
+    const int rounds = 1000000;
+    const auto start = std::chrono::steady_clock::now();
+    for (int i = 0; i < rounds; i++)
+    {{
+        function();
+    }}
+    return std::chrono::duration<double, std::nano>(std::chrono::steady_clock::now() - start).count() / rounds;
+}}
+
+template <typename T>
+void Compare(const char* text)
+{{
+    rapidjson::Document json;
+    json.Parse(("\\"" + std::string(text) + "\\"").c_str());
+    JsonSchemaError error;
+    const T value = *T::TryFromJson(json, error);
+    if (value.GetString() != BoostFormat(BoostParse(text)))
+    {{
+        std::cout << text << ": the generated class and boost disagree" << std::endl;
+        return;
+    }}
+    std::size_t sink = 0;
+    const double boostParse = NanosecondsPerCall([&]() {{ sink += BoostParse(json.GetString()).time_of_day().ticks(); }});
+    const double parse = NanosecondsPerCall([&]() {{ sink += T::TryFromJson(json, error)->Get().time_of_day().ticks(); }});
+    const double boostFormat = NanosecondsPerCall([&]() {{ sink += BoostFormat(value.Get()).size(); }});
+    const double format = NanosecondsPerCall([&]() {{ sink += value.GetString().size(); }});
+    std::cout << text
+        << ": parse " << parse << " ns (boost " << boostParse << " ns)"
+        << ", format " << format << " ns (boost " << boostFormat << " ns)"
+        << (sink == 0 ? " " : "") << std::endl;
+}}
+
+int main()
+{{
+{comparisons}
+    return 0;
+}}
+"""
+
+if __name__ == '__main__':
+    output_dir = os.path.join("output", "datetime_benchmark")
+    os.makedirs(output_dir, exist_ok=True)
+    spec = {"components": {"schemas": SCHEMAS}}
+    resolver = SimpleResolver("benchmark", root=spec)
+
+    cpp.LibraryGenerator(output_dir, output_dir, resolver).Generate()
+    generator = cpp.GeneratorFromSchema(src_output_dir=output_dir, header_output_dir=output_dir, resolver=resolver)
+    headers = []
+    for name, schema in SCHEMAS.items():
+        src, header = generator.Generate(schema, "#/components/schemas/{}".format(name), spec)
+        headers.append(header)
+
+    namespace = "::".join(resolver.cpp_get_namespace("#/components/schemas/sentAt"))
+    with open(os.path.join(output_dir, "datetime_benchmark.cpp"), "w") as fp:
+        fp.write(BENCHMARK_CPP.format(
+            includes="\n".join('#include "{}"'.format(h) for h in headers),
+            comparisons="\n".join('    Compare<{}::SentAt>("{}");'.format(namespace, text) for text in INPUTS),
+        ))
+    print("Generated {} and datetime_benchmark.cpp in {}".format(", ".join(headers), output_dir))
@@ -1,6 +1,5 @@
-from jsonschemacodegen import templator
+from jsonschemacodegen import markdown
 from jsonschemacodegen.resolver import SimpleResolver
-from jsonschemacodegen.schemawrappers import SchemaFactory
 
 schema = {
     "type" : "object",
@@ -46,6 +45,5 @@ schema = {
 
 if __name__ == '__main__':
     simpleResolver = SimpleResolver("myproject")
-    t = templator.Generator('jsonschemacodegen.templates.markdown', 'output')
-    schema = SchemaFactory(schema)
-    t.RenderTemplate('description.md.jinja2', 'example.md', schema=schema, resolver=simpleResolver)
+    generator = markdown.GeneratorFromSchema('output', resolver=simpleResolver)
+    generator.Generate(schema, 'example.md')
@@ -0,0 +1,79 @@
+import os
+import concurrent.futures
+
+_worker = None
+
+
+class _Worker(object):
+    """ The generator, spec and pointer index held by one worker process for the length of a batch,
+    so the resolver's document cache stays warm across components.
+    """
+
+    def __init__(self, generator, spec):
+        from .resolver import PointerIndex
+        self.generator = generator
+        self.spec = spec
+        self.index = PointerIndex(spec)
+
+    def Generate(self, path):
+        schema = self.index.lookup(path.split('#', 1)[1])
+        return path, self.generator.GenerateForBatch(schema, self.spec, path)
+
+
+def _init_worker(generator_class, generator_args, spec):
+    global _worker
+    _worker = _Worker(generator_class(**generator_args), spec)
+
+
+def _generate_in_worker(path):
+    return _worker.Generate(path)
+
+
+def ComponentPaths(spec, uri='') -> list:
+    """ Returns a reference for every schema in the spec's components/schemas section.
+    """
+    schemas = spec.get('components', {}).get('schemas', {})
+    return ["{}#/components/schemas/{}".format(uri, name) for name in schemas]
+
+
+def GenerateAll(generator, spec, paths, workers=None) -> dict:
+    """ Generates the schema at each of `paths` within `spec`.
+    The generator must provide GenerateForBatch(schema, root, path) and BatchArgs(), the latter returning
+    the (picklable) keyword arguments needed to construct an equivalent generator in a worker process.
+    @param workers is the number of worker processes.  None means one per CPU, and 1 generates in this process.
+    @returns a dict mapping each path to what was generated for it, in the order of `paths`.
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, max(len(paths), 1))
+    if workers == 1:
+        worker = _Worker(generator, spec)
+        results = dict([worker.Generate(p) for p in paths])
+        if getattr(generator, 'manifest', None) is not None:
+            generator.manifest.Save()
+        return results
+    results = {}
+    todo = paths
+    digests = {}
+    if getattr(generator, 'manifest', None) is not None:
+        # Workers don't share the manifest, so up-to-date paths are skipped here and new results recorded afterwards.
+        from .resolver import PointerIndex
+        index = PointerIndex(spec)
+        todo = []
+        for p in paths:
+            digests[p] = generator.GetDigest(index.lookup(p.split('#', 1)[1]), p, spec)
+            if generator.manifest.IsCurrent(p, digests[p]):
+                results[p] = tuple(generator.manifest.GetResult(p))
+            else:
+                todo.append(p)
+    if len(todo) > 0:
+        chunksize = max(1, len(todo) // (workers * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                initializer=_init_worker,
+                initargs=(type(generator), generator.BatchArgs(), spec)) as executor:
+            results.update(dict(executor.map(_generate_in_worker, todo, chunksize=chunksize)))
+    if getattr(generator, 'manifest', None) is not None:
+        for p in todo:
+            generator.manifest.Record(p, digests[p], generator.GetOutputFiles(results[p]), list(results[p]))
+        generator.manifest.Save()
+    return dict([(p, results[p]) for p in paths])
@@ -3,8 +3,10 @@ import abc
 import stringcase
 import os
 
-from jacobsjinjatoo import templator
 from . import schemawrappers
+from . import templating
+from . import batch
+from . import manifest
 
 class ResolverBaseClass(abc.ABC):
 
@@ -82,47 +84,133 @@ class ResolverBaseClass(abc.ABC):
         pass
 
 
+class GeneratorOptions(object):
+    """ Choices about the form of the generated C++ code.  Each defaults to what was always generated.
+    @param simple_pattern_matchers makes string patterns that patterns.CompileSimplePattern accepts be
+        checked by a generated matcher instead of std::regex.
+    @param sax_handlers adds a `<Name>Handler` class beside each class, which builds it from the tokens of a
+        rapidjson::Reader instead of from a DOM.  The LibraryGenerator must be given the same options.
+    @param unknown_members is what deserializing an object does with members that aren't among its properties:
+        'ignore' skips them, 'reject' rejects the object, and 'schema' rejects them only from objects whose
+        schema has `additionalProperties: false`.
+    @param compact_layout shrinks the generated classes: objects keep their optional properties in place with a
+        bitset saying which are present, handles point to the property name instead of copying it, and oneOf
+        options that are objects or arrays are kept on the heap.  The LibraryGenerator must be given the same options.
+    @param max_sizeof, if given, adds a static_assert that each generated class is at most that many bytes.
+    @param inline_capacity, if given, keeps strings whose maxLength and arrays whose maxItems is at most this
+        in place, in a fixed-capacity buffer, instead of on the heap.  The LibraryGenerator must be given the same options.
+    @param trusted_input adds FromJsonUnchecked() to each class, and SetUnchecked() to strings and numbers, which skip
+        the schema's constraints.  The same checks are skipped within a lib::TrustedInput scope, and everywhere when
+        the code is compiled with JSON_SCHEMA_TRUSTED_INPUT defined.  The LibraryGenerator must be given the same options.
+    @param views adds a `<Name>View` class beside each string, object and array class, which refers to the JSON it was
+        read from, with strings as std::string_views, instead of copying it.  The generated code then needs C++17.
+    """
+
+    UNKNOWN_MEMBER_POLICIES = ('ignore', 'reject', 'schema')
+
+    def __init__(self, simple_pattern_matchers=False, sax_handlers=False, unknown_members='ignore', compact_layout=False, max_sizeof=None, inline_capacity=None, trusted_input=False, views=False):
+        assert(unknown_members in self.UNKNOWN_MEMBER_POLICIES), "unknown_members is %s" % (unknown_members)
+        self.simple_pattern_matchers = simple_pattern_matchers
+        self.sax_handlers = sax_handlers
+        self.unknown_members = unknown_members
+        self.compact_layout = compact_layout
+        self.max_sizeof = max_sizeof
+        self.inline_capacity = inline_capacity
+        self.trusted_input = trusted_input
+        self.views = views
+
+    def InlineCapacity(self, bound):
+        """ Returns the capacity to keep in place for a string or array of at most `bound` bytes or items,
+        or None if it should be kept on the heap.
+        """
+        if self.inline_capacity is None or bound is None or bound > self.inline_capacity:
+            return None
+        return bound
+
+    def AsDict(self) -> dict:
+        return dict(self.__dict__)
+
+
 class GeneratorFromSchema(object):
 
-    def __init__(self, src_output_dir, header_output_dir, resolver):
+    def __init__(self, src_output_dir, header_output_dir, resolver, template_cache_dir=None, manifest_file=None, options=None):
         self.output_dir = {
             "src": src_output_dir,
             "header": header_output_dir,
         }
         assert(isinstance(resolver, ResolverBaseClass)), "Resolver is %s" % (resolver)
         self.resolver = resolver
+        self.template_cache_dir = template_cache_dir
+        self.generator = templating.CodeTemplator('jsonschemacodegen.templates.cpp', template_cache_dir)
+        self.manifest = manifest_file and manifest.Manifest(manifest_file) or None
+        self.options = options or GeneratorOptions()
 
     def _make_sure_directory_exists(self, output_key, dir_path):
         d = os.path.join(self.output_dir[output_key], dir_path)
-        if not os.path.exists(d):
-            os.makedirs(d)
+        os.makedirs(d, exist_ok=True)
 
     def GetDeps(self, schema):
-        return schema.CppIncludes(self.resolver)
+        return sorted(schema.CppIncludes(self.resolver))
+
+    def GetDigest(self, schema, path, root=None):
+        """ Hashes everything that the files generated for `schema` depend upon.
+        """
+        if not hasattr(self.resolver, 'get_json'):
+            return None
+        extra = {
+            "path": path,
+            "templates": manifest.TemplatesDigest('jsonschemacodegen.templates.cpp'),
+            "output_dir": self.output_dir,
+            "namespace": self.resolver.cpp_get_namespace(path),
+            "usings": self.resolver.cpp_get_usings(),
+            "lib_ns": self.resolver.cpp_get_lib_ns(),
+            "options": self.options.AsDict(),
+        }
+        return manifest.SchemaDigest(schema, self.resolver, root, extra)
+
+    def GetOutputFiles(self, result) -> list:
+        src, header = result
+        outputs = [os.path.join(self.output_dir['header'], header)]
+        if src is not None:
+            outputs.append(os.path.join(self.output_dir['src'], src))
+        return outputs
 
-    def Generate(self, schema, path):
+    def Generate(self, schema, path, root=None):
+        """ Generates the header, and unless `schema` is a reference the source, for the object at `path`.
+        When a manifest file is used, the files aren't rendered again if nothing they depend upon has changed.
+        Call manifest.Save() afterwards to keep the updated manifest.
+        """
+        if self.manifest is None:
+            return self._Generate(schema, path, root)
+        digest = self.GetDigest(schema, path, root)
+        if self.manifest.IsCurrent(path, digest):
+            return tuple(self.manifest.GetResult(path))
+        result = self._Generate(schema, path, root)
+        self.manifest.Record(path, digest, self.GetOutputFiles(result), list(result))
+        return result
+
+    def _Generate(self, schema, path, root=None):
         retval = [None, None]
-        srcGenerator = templator.CodeTemplator(self.output_dir['src']).add_template_package('jsonschemacodegen.templates.cpp')
-        headerGenerator = templator.CodeTemplator(self.output_dir['header']).add_template_package('jsonschemacodegen.templates.cpp')
         args = {
             "Name": self.resolver.cpp_get_name(path),
-            "schema": schemawrappers.SchemaFactory(schema),
+            "schema": schemawrappers.SchemaFactory(schema, root),
+            "options": self.options,
         }
         headerFilename = self.resolver.cpp_get_header(path)
         self._make_sure_directory_exists('header', os.path.dirname(headerFilename))
         if '$ref' not in schema:
             srcFileName = "{}.cpp".format(self.resolver.cpp_get_filename_base(path))
             self._make_sure_directory_exists('src', os.path.dirname(srcFileName))
-            srcGenerator.render_template(template_name="source.cpp.jinja2", 
-                output_name=srcFileName, 
+            self.generator.render_template(template_name="source.cpp.jinja2", 
+                output_name=os.path.join(self.output_dir['src'], srcFileName), 
                 deps=['"{}"'.format(self.resolver.cpp_get_header(path))], 
                 usings=self.resolver.cpp_get_usings(),
                 ns=self.resolver.cpp_get_namespace(path),
                 resolver=self.resolver,
                 **args)
             retval[0] = srcFileName
-        headerGenerator.render_template(template_name="header.hpp.jinja2", 
-            output_name=headerFilename, 
+        self.generator.render_template(template_name="header.hpp.jinja2", 
+            output_name=os.path.join(self.output_dir['header'], headerFilename), 
             ns=self.resolver.cpp_get_namespace(path),
             deps=self.GetDeps(args['schema']), 
             resolver=self.resolver,
@@ -132,26 +220,81 @@ class GeneratorFromSchema(object):
         retval[1] = headerFilename
         return tuple(retval)
 
+    def BatchArgs(self) -> dict:
+        return {
+            "src_output_dir": self.output_dir['src'],
+            "header_output_dir": self.output_dir['header'],
+            "resolver": self.resolver,
+            "template_cache_dir": self.template_cache_dir,
+            "options": self.options,
+        }
+
+    def GenerateForBatch(self, schema, root, path):
+        return self.Generate(schema, path, root)
+
+    def GenerateAll(self, spec, paths=None, workers=None) -> dict:
+        """ Generates source and header files for many schemas in `spec`, in parallel worker processes.
+        @param paths are the references to generate, defaulting to every schema in components/schemas.
+        @param workers is the number of processes to use; None for one per CPU.
+        @returns a dict mapping each path to the (source, header) filenames that Generate() returned for it.
+        When a manifest file is used, up-to-date paths are skipped and the manifest is saved afterwards.
+        """
+        if paths is None:
+            paths = batch.ComponentPaths(spec, getattr(self.resolver, 'uri', ''))
+        return batch.GenerateAll(self, spec, paths, workers)
+
 
 class LibraryGenerator(object):
 
-    def __init__(self, src_output_dir: str, header_output_dir: str, resolver):
+    def __init__(self, src_output_dir: str, header_output_dir: str, resolver, template_cache_dir=None, options=None):
         self.output_dir = {
             "src": src_output_dir,
             "header": header_output_dir,
         }
         self.resolver = resolver
+        self.generator = templating.CodeTemplator('jsonschemacodegen.templates.cpp', template_cache_dir)
+        self.options = options or GeneratorOptions()
     
     def _make_sure_directory_exists(self, output_key, dir_path):
         d = os.path.join(self.output_dir[output_key], dir_path)
-        if not os.path.exists(d):
-            os.makedirs(d)
+        os.makedirs(d, exist_ok=True)
 
     def Generate(self):
+        """ Generates exceptions.hpp, rfc3339.hpp and lexical.hpp, with the sax_handlers option sax.hpp, with the
+        compact_layout option compact.hpp, with the inline_capacity option inline_storage.hpp, and with the trusted_input
+        option trusted.hpp beside them.
+        """
         retval = [None, "exceptions.hpp"]
-        headerGenerator = templator.CodeTemplator(self.output_dir['header']).add_template_package('jsonschemacodegen.templates.cpp')
-        headerGenerator.render_template(template_name="exceptions.hpp.jinja2", 
-            output_name="exceptions.hpp", 
+        self.generator.render_template(template_name="exceptions.hpp.jinja2", 
+            output_name=os.path.join(self.output_dir['header'], "exceptions.hpp"), 
             ns=self.resolver.cpp_get_lib_ns(), 
         )
+        self.generator.render_template(template_name="rfc3339.hpp.jinja2",
+            output_name=os.path.join(self.output_dir['header'], "rfc3339.hpp"),
+            ns=self.resolver.cpp_get_lib_ns(),
+        )
+        self.generator.render_template(template_name="lexical.hpp.jinja2",
+            output_name=os.path.join(self.output_dir['header'], "lexical.hpp"),
+            ns=self.resolver.cpp_get_lib_ns(),
+        )
+        if self.options.sax_handlers:
+            self.generator.render_template(template_name="sax.hpp.jinja2",
+                output_name=os.path.join(self.output_dir['header'], "sax.hpp"),
+                ns=self.resolver.cpp_get_lib_ns(),
+            )
+        if self.options.compact_layout:
+            self.generator.render_template(template_name="compact.hpp.jinja2",
+                output_name=os.path.join(self.output_dir['header'], "compact.hpp"),
+                ns=self.resolver.cpp_get_lib_ns(),
+            )
+        if self.options.inline_capacity is not None:
+            self.generator.render_template(template_name="inline_storage.hpp.jinja2",
+                output_name=os.path.join(self.output_dir['header'], "inline_storage.hpp"),
+                ns=self.resolver.cpp_get_lib_ns(),
+            )
+        if self.options.trusted_input:
+            self.generator.render_template(template_name="trusted.hpp.jinja2",
+                output_name=os.path.join(self.output_dir['header'], "trusted.hpp"),
+                ns=self.resolver.cpp_get_lib_ns(),
+            )
         return tuple(retval)
@@ -1,6 +1,12 @@
 import json
 import random
 import abc
+import hashlib
+import gzip
+import os
+import time
+import itertools
+import concurrent.futures
 from copy import copy
 from . import schemawrappers
 
@@ -21,6 +27,242 @@ class SchemaResolverBaseClass(abc.ABC):
         pass
 
 
+_MASK64 = (1 << 64) - 1
+
+# How many example indexes are evaluated together in one walk of a schema.
+BATCH_SIZE = 256
+
+def _mix64(value):
+    # splitmix64 finalizer
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class IndexPermutation(object):
+    """ A seeded pseudo-random permutation of range(size), computed one position at a time.
+    It is a balanced Feistel network over the smallest even number of bits covering `size`, with
+    cycle-walking to stay within range, so drawing indexes without replacement takes O(1) memory.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        bits = max(2, schemawrappers.bitsNeededForNumber(max(size - 1, 0)))
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = schemawrappers.rightBitMask(self.half_bits)
+        self.keys = [_mix64((seed & _MASK64) ^ _mix64(r + 1)) for r in range(0, self.ROUNDS)]
+
+    def _function(self, value, key):
+        # Folds all of `value` into the key, then expands it back out to half_bits.
+        h = key
+        while value:
+            h = _mix64(h ^ (value & _MASK64))
+            value >>= 64
+        out = 0
+        for chunk in range(0, (self.half_bits + 63) // 64):
+            out |= _mix64(h ^ chunk) << (64 * chunk)
+        return out & self.half_mask
+
+    def _round(self, value):
+        left = value >> self.half_bits
+        right = value & self.half_mask
+        for key in self.keys:
+            left, right = right, left ^ self._function(right, key)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, position):
+        if position < 0 or position >= self.size:
+            raise IndexError(position)
+        value = self._round(position)
+        while value >= self.size:
+            value = self._round(value)
+        return value
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for position in range(0, self.size):
+            yield self[position]
+
+
+class CorpusReport(object):
+    """ What GenerateCorpus wrote: the shard files, how many examples and (uncompressed) bytes, and how long it took.
+    """
+
+    def __init__(self, files, examples, size, seconds):
+        self.files = files
+        self.examples = examples
+        self.bytes = size
+        self.seconds = seconds
+
+    @property
+    def examples_per_second(self):
+        return self.seconds and self.examples / self.seconds or 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.seconds and self.bytes / self.seconds or 0.0
+
+    def __repr__(self):
+        return "{} examples, {} bytes in {:.2f}s ({:.0f} examples/s, {:.0f} bytes/s) across {} files".format(
+            self.examples, self.bytes, self.seconds, self.examples_per_second, self.bytes_per_second, len(self.files))
+
+
+def _write_shard(resolver, schema, filename, start, stop, index_max, random_seed):
+    """ Writes the examples at permutation positions [start, stop) to `filename` as NDJSON.
+    Positions past the end of the index space wrap around.  Returns (examples, bytes).
+    """
+    permutation = IndexPermutation(index_max, random_seed)
+    size = 0
+    if filename.endswith('.gz'):
+        # A fixed mtime keeps the compressed output reproducible.
+        fp = gzip.GzipFile(filename, 'wb', compresslevel=6, mtime=0)
+    else:
+        fp = open(filename, 'wb')
+    with fp:
+        for chunk in range(start, stop, BATCH_SIZE):
+            indexes = [schemawrappers.ExampleIndex(permutation[p % index_max]) for p in range(chunk, min(chunk + BATCH_SIZE, stop))]
+            for ex in schema.Examples(resolver, indexes):
+                line = (json.dumps(ex, separators=(',', ':')) + "\n").encode('utf-8')
+                fp.write(line)
+                size += len(line)
+    return (stop - start, size)
+
+
+class CoveringIndex(schemawrappers.ExampleIndex):
+    """ An ExampleIndex whose choices are made by a _CoveringRun instead of being read from bits.
+    The run records each labelled choice, and the plain index number that reproduces them.
+    Labels are only passed by Example(), not by the batched Examples().
+    """
+
+    def __init__(self, run, references=()):
+        # An index of None isn't minimal, so recursion that is cut short switches to index 0, as it would on replay.
+        super().__init__(None, references)
+        self.run = run
+
+    def Descend(self, ref):
+        return CoveringIndex(self.run, self.references + (ref,))
+
+    def BooleanChoice(self, label=None):
+        return bool(self.run.Choose(label, 1))
+
+    def Number(self, maximum, label=None) -> int:
+        if maximum == 0:
+            return 0
+        return self.run.Choose(label, maximum)
+
+
+class _CoveringRun(object):
+    """ The choices made while building one candidate example for GenerateCovering.
+    """
+
+    def __init__(self, chooser):
+        self.chooser = chooser
+        self.assigned = set()
+        self.index = 0
+        self._shift = 0
+
+    def Choose(self, label, maximum) -> int:
+        label = label or (0, '')
+        value = self.chooser(label, maximum + 1, self)
+        self.index |= value << self._shift
+        self._shift += schemawrappers.bitsNeededForNumber(maximum)
+        self.assigned.add((label, value))
+        return value
+
+
+class CoverageReport(object):
+    """ How much of the example space a GenerateCovering selection exercises.
+    A factor is a choice point that was reached (an optional property, enum, oneOf, ...) and its values
+    are its options.  Combinations are the `strength`-wise groups of values of different factors;
+    some of them may be impossible to reach together, so full combination coverage isn't always possible.
+    """
+
+    def __init__(self, strength, indexes, factors, values_covered, combinations, combinations_covered, uncovered):
+        self.strength = strength
+        self.indexes = indexes
+        self.factors = len(factors)
+        self.values = sum(factors.values())
+        self.values_covered = values_covered
+        self.combinations = combinations
+        self.combinations_covered = combinations_covered
+        self.uncovered = uncovered
+
+    @property
+    def value_coverage(self):
+        return self.values and self.values_covered / self.values or 1.0
+
+    @property
+    def combination_coverage(self):
+        return self.combinations and self.combinations_covered / self.combinations or 1.0
+
+    def __repr__(self):
+        return "{} examples cover {}/{} values ({:.1%}) of {} factors and {}/{} {}-wise combinations ({:.1%})".format(
+            len(self.indexes), self.values_covered, self.values, self.value_coverage, self.factors,
+            self.combinations_covered, self.combinations, self.strength, self.combination_coverage)
+
+
+def _count_combinations(arities, strength) -> int:
+    # The elementary symmetric polynomial of degree `strength` over the arities.
+    counts = [1] + [0] * strength
+    for arity in arities:
+        for k in range(strength, 0, -1):
+            counts[k] += counts[k-1] * arity
+    return counts[strength]
+
+
+class _CoveringSelector(object):
+    """ Greedily builds a t-wise covering set of examples, discovering choice points as they are reached.
+    Within a candidate, each choice takes the option that covers the most new values, then the most new
+    combinations with the choices already made.  Of several candidates, the one covering the most is kept.
+    """
+
+    def __init__(self, strength, rng):
+        self.strength = strength
+        self.rng = rng
+        self.factors = {}
+        self.covered = set()
+
+    def _Tuples(self, item, others):
+        for combo in itertools.combinations(sorted([o for o in others if o[0] != item[0]]), self.strength - 1):
+            if len(set([c[0] for c in combo])) == len(combo):
+                yield tuple(sorted(combo + (item,)))
+
+    def Choose(self, label, arity, run) -> int:
+        self.factors[label] = max(arity, self.factors.get(label, 0))
+        best = None
+        for value in range(0, arity):
+            item = (label, value)
+            gain = (0, 0)
+            if item not in run.assigned:
+                new_tuples = len([t for t in self._Tuples(item, run.assigned) if t not in self.covered])
+                gain = (int((item,) not in self.covered), new_tuples)
+            score = gain + (self.rng.random(),)
+            if best is None or score > best[0]:
+                best = (score, value)
+        return best[1]
+
+    def NewCoverage(self, run) -> set:
+        """ The values (as 1-tuples) and combinations that `run` covers and aren't covered yet.
+        """
+        new = set([(item,) for item in run.assigned]) - self.covered
+        for item in run.assigned:
+            new.update([t for t in self._Tuples(item, run.assigned) if t not in self.covered])
+        return new
+
+    def Report(self, indexes) -> CoverageReport:
+        values_covered = len([t for t in self.covered if len(t) == 1])
+        uncovered = sorted([(label[1], value) for label, arity in self.factors.items()
+            for value in range(0, arity) if ((label, value),) not in self.covered])
+        combinations_covered = len([t for t in self.covered if len(t) == self.strength])
+        return CoverageReport(self.strength, indexes, self.factors, values_covered,
+            _count_combinations(self.factors.values(), self.strength), combinations_covered, uncovered)
+
+
 class GeneratorFromSchema(object):
 
     def __init__(self, resolver=None):
@@ -30,10 +272,12 @@ class GeneratorFromSchema(object):
     def DeDuplicate(aList : list, limit=None) -> list:
         text_list = [json.dumps(a, sort_keys=True) for a in aList]
         text_unique = []
+        text_seen = set()
         for t in text_list:
             if len(text_unique) == limit:
                 break
-            if t not in text_unique:
+            if t not in text_seen:
+                text_seen.add(t)
                 text_unique.append(t)
         text_sorted = sorted(text_unique, key=len)
         return [json.loads(s) for s in text_sorted]
@@ -51,17 +295,97 @@ class GeneratorFromSchema(object):
             indexes = [schemawrappers.ExampleIndex(i) for i in range(1, index_max)]
             random.shuffle(indexes)
         else:
-            index_numbers = []
+            index_numbers = set()
             while len(indexes) < number_of_examples*3:
                 rand_index = random.randint(1, index_max)
                 if rand_index not in index_numbers:
                     indexes.append(schemawrappers.ExampleIndex(rand_index))
-                    index_numbers.append(rand_index)
-        for index in indexes:
-            ex = schema.Example(self.resolver, index)
-            examples.append(ex)
+                    index_numbers.add(rand_index)
+        examples = schema.Examples(self.resolver, indexes)
         return self.DeDuplicate(examples, limit=number_of_examples)
 
+    def IterExamples(self, schema, number_of_examples=None, random_seed=0xBEEF):
+        """ Lazily yields up to `number_of_examples` unique examples (all of them if None).
+        Example indexes are drawn without replacement through an IndexPermutation, and duplicates are
+        skipped by remembering a digest of each example, so the output is the same for a given seed.
+        """
+        number_of_combos = schema.GetExampleCombos(self.resolver)
+        index_max = 1 << schemawrappers.bitsNeededForNumber(number_of_combos)
+        seen = set()
+        permutation = IndexPermutation(index_max, random_seed)
+        batch_size = 8
+        pos = 0
+        while pos < index_max:
+            stop = min(pos + batch_size, index_max)
+            indexes = [schemawrappers.ExampleIndex(permutation[p]) for p in range(pos, stop)]
+            pos = stop
+            for ex in schema.Examples(self.resolver, indexes):
+                if number_of_examples is not None and len(seen) >= number_of_examples:
+                    return
+                digest = hashlib.blake2b(json.dumps(ex, sort_keys=True).encode('utf-8'), digest_size=16).digest()
+                if digest not in seen:
+                    seen.add(digest)
+                    yield ex
+            # Batches grow as examples keep coming, up to BATCH_SIZE.
+            batch_size = min(batch_size * 2, BATCH_SIZE)
+
+    def GenerateCorpus(self, schema, output_dir, number_of_examples, shards=1, workers=None,
+            random_seed=0xBEEF, compress=True, prefix='examples') -> CorpusReport:
+        """ Writes `number_of_examples` examples (not de-duplicated) as NDJSON, split into `shards` files
+        that are generated in parallel worker processes.  Each shard takes a contiguous run of positions in
+        the seeded IndexPermutation, so shards don't overlap and a (seed, shard) always produces the same file.
+        Examples are streamed to disk, so memory use doesn't grow with the corpus size.
+        @param workers is the number of processes; None for one per CPU, 1 to write the shards in this process.
+        """
+        start_time = time.time()
+        index_max = 1 << schemawrappers.bitsNeededForNumber(schema.GetExampleCombos(self.resolver))
+        os.makedirs(output_dir, exist_ok=True)
+        per_shard = -(-number_of_examples // shards)
+        jobs = []
+        for shard in range(0, shards):
+            start = min(shard * per_shard, number_of_examples)
+            stop = min(start + per_shard, number_of_examples)
+            filename = os.path.join(output_dir, "{}-{:05d}.ndjson{}".format(prefix, shard, compress and '.gz' or ''))
+            jobs.append((self.resolver, schema, filename, start, stop, index_max, random_seed))
+        workers = min(workers or os.cpu_count() or 1, shards)
+        if workers == 1:
+            results = [_write_shard(*job) for job in jobs]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_write_shard, *zip(*jobs)))
+        return CorpusReport([job[2] for job in jobs],
+            sum([r[0] for r in results]),
+            sum([r[1] for r in results]),
+            time.time() - start_time)
+
+    def GenerateCovering(self, schema, strength=2, random_seed=0xBEEF, candidates=16, max_examples=None) -> tuple:
+        """ Picks a small set of examples that together exercise every option of every choice point
+        (each optional property present and absent, each enum value, oneOf branch, array length, ...),
+        and every `strength`-wise combination of options, pairwise by default, as far as they can co-occur.
+        The set is built greedily, so it is small but not guaranteed minimal.
+        @returns (examples, CoverageReport).  The report's `indexes` are the plain example index numbers
+        that reproduce each example with ExampleIndex.
+        """
+        assert strength >= 1, "The covering strength must be at least 1"
+        selector = _CoveringSelector(strength, random.Random(random_seed))
+        examples = []
+        indexes = []
+        while max_examples is None or len(examples) < max_examples:
+            best = None
+            for _ in range(0, candidates):
+                run = _CoveringRun(selector.Choose)
+                example = schema.Example(self.resolver, CoveringIndex(run))
+                new = selector.NewCoverage(run)
+                score = (len([t for t in new if len(t) == 1]), len(new))
+                if best is None or score > best[0]:
+                    best = (score, example, run, new)
+            if len(best[3]) == 0 and len(examples) > 0:
+                break
+            selector.covered.update(best[3])
+            examples.append(best[1])
+            indexes.append(best[2].index)
+        return examples, selector.Report(indexes)
+
     def GenerateFull(self, schema) -> list:
         index = schemawrappers.ExampleIndex(-1)
         return [schema.Example(self.resolver, index)]
@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+import importlib
+
+from . import _version
+
+_template_digests = {}
+
+
+def TemplatesDigest(package) -> str:
+    """ Returns a hash of every template in a template package.  It is computed once per process.
+    """
+    if package not in _template_digests:
+        h = hashlib.sha256()
+        template_dir = os.path.dirname(importlib.import_module(package).__file__)
+        for name in sorted(os.listdir(template_dir)):
+            if name.endswith('.jinja2'):
+                h.update(name.encode('utf-8'))
+                with open(os.path.join(template_dir, name), 'rb') as fp:
+                    h.update(fp.read())
+        _template_digests[package] = h.hexdigest()
+    return _template_digests[package]
+
+
+def _find_references(node, refs):
+    if isinstance(node, dict):
+        if '$ref' in node and isinstance(node['$ref'], str):
+            refs.append(node['$ref'])
+        for v in node.values():
+            _find_references(v, refs)
+    elif isinstance(node, list):
+        for v in node:
+            _find_references(v, refs)
+
+
+def SchemaDigest(schema, resolver, root=None, extra=None):
+    """ Hashes `schema` together with everything reachable from it through `$ref`, the
+    generator version and `extra`.  Returns None if a reference couldn't be resolved, in which
+    case the schema should always be regenerated.
+    """
+    h = hashlib.sha256()
+    h.update(_version.__version__.encode('utf-8'))
+    h.update(json.dumps(extra, sort_keys=True, default=str).encode('utf-8'))
+    h.update(json.dumps(schema, sort_keys=True, default=str).encode('utf-8'))
+    pending = []
+    _find_references(schema, pending)
+    seen = set()
+    while pending:
+        ref = pending.pop()
+        if ref in seen:
+            continue
+        seen.add(ref)
+        try:
+            target = resolver.get_json(ref, root)
+        except Exception:
+            return None
+        h.update(ref.encode('utf-8'))
+        h.update(json.dumps(target, sort_keys=True, default=str).encode('utf-8'))
+        _find_references(target, pending)
+    return h.hexdigest()
+
+
+def WriteIfChanged(filename, text) -> bool:
+    """ Writes `text` to `filename` unless the file already has exactly that content, so unchanged
+    outputs keep their modification time.  Returns True if the file was written.
+    """
+    data = text.encode('utf-8')
+    try:
+        with open(filename, 'rb') as fp:
+            if fp.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(filename, 'wb') as fp:
+        fp.write(data)
+    return True
+
+
+class Manifest(object):
+    """ Records, for each generated path, the digest of its inputs and the files it produced.
+    Stored as JSON at `filename`; call Save() to persist it.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+        if os.path.exists(filename):
+            with open(filename, 'r') as fp:
+                self.entries = json.load(fp)
+
+    def IsCurrent(self, path, digest, output_dirs=None) -> bool:
+        """ True if `path` was last generated from inputs with the same digest and its outputs still exist.
+        """
+        entry = self.entries.get(path, None)
+        if digest is None or entry is None or entry['digest'] != digest:
+            return False
+        for output in entry['outputs']:
+            if not os.path.exists(output):
+                return False
+        return True
+
+    def GetResult(self, path):
+        return self.entries[path]['result']
+
+    def Record(self, path, digest, outputs, result):
+        if digest is None:
+            self.entries.pop(path, None)
+            return
+        self.entries[path] = {
+            "digest": digest,
+            "outputs": sorted(outputs),
+            "result": result,
+        }
+
+    def Save(self):
+        text = json.dumps(self.entries, sort_keys=True, indent=1)
+        WriteIfChanged(self.filename, text)
@@ -0,0 +1,19 @@
+import os.path
+
+from . import schemawrappers
+from . import templating
+
+
+class GeneratorFromSchema(object):
+
+    def __init__(self, output_dir, resolver=None, template_cache_dir=None):
+        self.output_dir = output_dir
+        self.resolver = resolver
+        self.generator = templating.CodeTemplator('jsonschemacodegen.templates.markdown', template_cache_dir)
+
+    def Generate(self, schema, filename, root=None):
+        output_name = os.path.join(self.output_dir, filename)
+        return self.generator.render_template(template_name="description.md.jinja2",
+            output_name=output_name,
+            schema=schemawrappers.SchemaFactory(schema, root),
+            resolver=self.resolver)
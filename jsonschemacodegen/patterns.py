@@ -0,0 +1,277 @@
+MAX_POSITIONS = 64
+
+_DIGIT = [(0x30, 0x39)]
+_WORD = [(0x30, 0x39), (0x41, 0x5A), (0x5F, 0x5F), (0x61, 0x7A)]
+_SPACE = [(0x09, 0x0D), (0x20, 0x20)]
+_LINE_TERMINATORS = [(0x0A, 0x0A), (0x0D, 0x0D)]
+
+_CLASS_ESCAPES = {
+    'd': (_DIGIT, False),
+    'D': (_DIGIT, True),
+    'w': (_WORD, False),
+    'W': (_WORD, True),
+    's': (_SPACE, False),
+    'S': (_SPACE, True),
+}
+
+_CHAR_ESCAPES = {
+    't': 0x09,
+    'n': 0x0A,
+    'v': 0x0B,
+    'f': 0x0C,
+    'r': 0x0D,
+}
+
+
+class NotSimplePatternException(Exception):
+    pass
+
+
+class CharacterSet(object):
+    """ The bytes one position of a SimplePattern accepts, as inclusive (low, high) ranges.
+    """
+
+    def __init__(self, ranges, negated=False):
+        self.ranges = ranges
+        self.negated = negated
+
+    def CppCondition(self, var) -> str:
+        """ Returns a C++ boolean expression testing whether the unsigned char `var` is in the set.
+        """
+        tests = []
+        for low, high in self.ranges:
+            if low == high:
+                tests.append("{} == {}".format(var, low))
+            else:
+                tests.append("({} >= {} && {} <= {})".format(var, low, var, high))
+        expr = " || ".join(tests) or "false"
+        if self.negated:
+            return "!({})".format(expr)
+        return "({})".format(expr)
+
+
+class SimplePattern(object):
+    """ A regular expression made only of a sequence of characters, escapes, character classes and
+    `.`, each optionally repeated by `?`, `*`, `+` or a bounded `{n,m}`, with optional `^` and `$` at its ends.
+    It is compiled to a Glushkov automaton of at most MAX_POSITIONS positions, so generated code
+    can match it with one 64-bit state mask and no allocation.  Like std::regex_match, the whole
+    string must match.
+    @param positions is the CharacterSet of each position.
+    @param first is the mask of positions that can match the first character.
+    @param follow is, for each position, the mask of positions that can match the character after it.
+    @param last is the mask of positions that can match the final character.
+    @param nullable is whether the empty string matches.
+    """
+
+    def __init__(self, pattern, positions, first, follow, last, nullable):
+        self.pattern = pattern
+        self.positions = positions
+        self.first = first
+        self.follow = follow
+        self.last = last
+        self.nullable = nullable
+
+    def Matches(self, text) -> bool:
+        """ Matches the bytes of `text`, the same way the generated C++ does.
+        """
+        if isinstance(text, str):
+            text = text.encode('utf-8')
+        matches = self.nullable
+        candidates = self.first
+        for c in text:
+            matched = 0
+            for i, charset in enumerate(self.positions):
+                if (candidates >> i) & 1 and _in_set(charset, c):
+                    matched |= 1 << i
+            candidates = 0
+            for i in range(0, len(self.positions)):
+                if (matched >> i) & 1:
+                    candidates |= self.follow[i]
+            matches = (matched & self.last) != 0
+            if matched == 0:
+                break
+        return matches
+
+
+def _in_set(charset, c) -> bool:
+    found = any([low <= c <= high for low, high in charset.ranges])
+    return found != charset.negated
+
+
+class _Parser(object):
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.pos = 0
+
+    def _peek(self):
+        return self.pos < len(self.pattern) and self.pattern[self.pos] or None
+
+    def _next(self):
+        c = self._peek()
+        if c is None:
+            raise NotSimplePatternException("The pattern ends unexpectedly")
+        self.pos += 1
+        return c
+
+    def _literal(self, c):
+        if ord(c) > 0x7F:
+            # A non-ASCII character is several bytes in UTF-8, so isn't one position.
+            raise NotSimplePatternException("Non-ASCII character {!r}".format(c))
+        return ord(c)
+
+    def _escape(self):
+        c = self._next()
+        if c in _CLASS_ESCAPES:
+            return _CLASS_ESCAPES[c]
+        if c in _CHAR_ESCAPES:
+            return _CHAR_ESCAPES[c]
+        if c.isalnum():
+            raise NotSimplePatternException("Unsupported escape \\{}".format(c))
+        return self._literal(c)
+
+    def _class(self):
+        negated = False
+        if self._peek() == '^':
+            negated = True
+            self._next()
+        if self._peek() == ']':
+            # ECMAScript reads []/[^] as an empty class, which this compiler doesn't handle.
+            raise NotSimplePatternException("Empty class")
+        ranges = []
+        while True:
+            c = self._next()
+            if c == ']':
+                break
+            if c == '[':
+                raise NotSimplePatternException("Nested class")
+            if c == '\\':
+                low = self._escape()
+                if isinstance(low, tuple):
+                    if low[1]:
+                        raise NotSimplePatternException("Negated escape inside a class")
+                    ranges.extend(low[0])
+                    continue
+            else:
+                low = self._literal(c)
+            if self._peek() == '-' and self.pos + 1 < len(self.pattern) and self.pattern[self.pos+1] != ']':
+                self._next()
+                c = self._next()
+                if c == '\\':
+                    high = self._escape()
+                else:
+                    high = self._literal(c)
+                if isinstance(high, tuple) or high < low:
+                    raise NotSimplePatternException("Invalid range in class")
+                ranges.append((low, high))
+            else:
+                ranges.append((low, low))
+        return CharacterSet(sorted(ranges), negated)
+
+    def _atom(self):
+        c = self._next()
+        if c == '\\':
+            escaped = self._escape()
+            if isinstance(escaped, tuple):
+                return CharacterSet(escaped[0], escaped[1])
+            return CharacterSet([(escaped, escaped)])
+        if c == '[':
+            return self._class()
+        if c == '.':
+            return CharacterSet(_LINE_TERMINATORS, True)
+        if c in '()|^$*+?{}]':
+            raise NotSimplePatternException("Unsupported {!r}".format(c))
+        value = self._literal(c)
+        return CharacterSet([(value, value)])
+
+    def _number(self):
+        start = self.pos
+        while self._peek() is not None and self._peek().isdigit():
+            self.pos += 1
+        if start == self.pos:
+            raise NotSimplePatternException("Expected a number")
+        return int(self.pattern[start:self.pos])
+
+    def _quantifier(self):
+        """ Returns (minimum, maximum) repeats, with None for no maximum.
+        """
+        c = self._peek()
+        bounds = (1, 1)
+        if c == '?':
+            bounds = (0, 1)
+        elif c == '*':
+            bounds = (0, None)
+        elif c == '+':
+            bounds = (1, None)
+        elif c == '{':
+            self._next()
+            low = self._number()
+            high = low
+            if self._peek() == ',':
+                self._next()
+                high = None
+                if self._peek() != '}':
+                    high = self._number()
+            if self._next() != '}' or (high is not None and high < low):
+                raise NotSimplePatternException("Invalid repeat")
+            self.pos -= 1
+            bounds = (low, high)
+        else:
+            return bounds
+        self._next()
+        if self._peek() == '?':
+            # Laziness doesn't change whether the whole string matches.
+            self._next()
+        return bounds
+
+    def Parse(self):
+        """ Returns a list of (CharacterSet, minimum, maximum) items.
+        """
+        items = []
+        if self._peek() == '^':
+            self._next()
+        while self._peek() is not None:
+            if self._peek() == '$' and self.pos == len(self.pattern) - 1:
+                self._next()
+                break
+            charset = self._atom()
+            low, high = self._quantifier()
+            items.append((charset, low, high))
+        return items
+
+
+def CompileSimplePattern(pattern) -> SimplePattern:
+    """ Compiles `pattern` into a SimplePattern.
+    @throws NotSimplePatternException if the pattern uses anything else (groups, alternation,
+    backreferences, lookaround, ...) or needs more than MAX_POSITIONS positions.
+    """
+    # Each factor is (charset, nullable, loops).
+    factors = []
+    for charset, low, high in _Parser(pattern).Parse():
+        factors.extend([(charset, False, False)] * low)
+        if high is None:
+            factors.append((charset, True, True))
+        else:
+            factors.extend([(charset, True, False)] * (high - low))
+    if len(factors) > MAX_POSITIONS:
+        raise NotSimplePatternException("The pattern needs {} positions".format(len(factors)))
+    first = 0
+    last = 0
+    follow = [0] * len(factors)
+    for i, (_, nullable, loops) in enumerate(factors):
+        if loops:
+            follow[i] |= 1 << i
+        for j in range(i + 1, len(factors)):
+            follow[i] |= 1 << j
+            if not factors[j][1]:
+                break
+    for i, (_, nullable, _) in enumerate(factors):
+        first |= 1 << i
+        if not nullable:
+            break
+    for i in range(len(factors) - 1, -1, -1):
+        last |= 1 << i
+        if not factors[i][1]:
+            break
+    nullable = all([f[1] for f in factors])
+    return SimplePattern(pattern, [f[0] for f in factors], first, follow, last, nullable)
@@ -3,9 +3,10 @@ import abc
 import stringcase
 import os.path
 
-from jacobsjinjatoo import templator
 from . import schemawrappers
 from . import json_example
+from . import templating
+from . import batch
 
 class ResolverBaseClass(abc.ABC):
 
@@ -33,41 +34,46 @@ class ResolverBaseClass(abc.ABC):
 
 class GeneratorFromSchema(object):
 
-    def __init__(self, output_dir, resolver=None):
+    def __init__(self, output_dir, resolver=None, template_cache_dir=None, example_strength=None):
+        """ @param example_strength, if given, makes generated tests use a covering set of examples of that
+        strength (2 for pairwise), instead of evenly spaced example indexes.
+        """
         self.output_dir = output_dir
         self.resolver = resolver
+        self.template_cache_dir = template_cache_dir
+        self.example_strength = example_strength
+        self.generator = templating.CodeTemplator('jsonschemacodegen.templates.python', template_cache_dir)
 
     def GetDeps(self, schema):
         return []
 
     def Generate(self, schema, root, class_name, filename_base):
-        generator = templator.CodeTemplator(self.output_dir)
-        generator.add_template_package('jsonschemacodegen.templates.python')
-
         args = {
             "Name": class_name,
             "schema": schemawrappers.SchemaFactory(schema, root),
         }
-        return generator.render_template(template_name="file.py.jinja2", output_name="{}.py".format(filename_base), resolver=self.resolver, **args)
+        output_name = os.path.join(self.output_dir, "{}.py".format(filename_base))
+        return self.generator.render_template(template_name="file.py.jinja2", output_name=output_name, resolver=self.resolver, **args)
 
     def Examples(self, schema, root):
         wrapped_schema = schemawrappers.SchemaFactory(schema, root)
         number_of_examples = wrapped_schema.GetExampleCombos(self.resolver)
-        examples = []
-        examples.append(wrapped_schema.Example(self.resolver, schemawrappers.ExampleIndex(0)))
-        examples.append(wrapped_schema.Example(self.resolver, schemawrappers.ExampleIndex(-1)))
+        indexes = [schemawrappers.ExampleIndex(0), schemawrappers.ExampleIndex(-1)]
+        if self.example_strength is not None:
+            examples, _ = json_example.GeneratorFromSchema(self.resolver).GenerateCovering(wrapped_schema, self.example_strength)
+            examples.extend(wrapped_schema.Examples(self.resolver, indexes))
+            return sorted(list(set([json.dumps(x) for x in examples])))
         show_examples = min(number_of_examples, 20)
         example_step = int(number_of_examples/show_examples)
         index = example_step
         for _ in range(0, show_examples):
-            examples.append(wrapped_schema.Example(self.resolver, schemawrappers.ExampleIndex(index)))
+            indexes.append(schemawrappers.ExampleIndex(index))
             index += example_step
+        examples = wrapped_schema.Examples(self.resolver, indexes)
         return sorted(list(set([json.dumps(x) for x in examples])))
 
     def GenerateTest(self, schema, root, class_name, filename_base, path):
         filename = self.resolver.py_test_filename(path)
-        generator = templator.CodeTemplator(os.path.join(self.output_dir, os.path.dirname(filename)))
-        generator.add_template_package('jsonschemacodegen.templates.python')
         wrapped_schema = schemawrappers.SchemaFactory(schema, root)
         args = {
             "Name": class_name.split('.')[-1],
@@ -77,16 +83,38 @@ class GeneratorFromSchema(object):
             "path": path,
             "objType": path.split("/")[-2]
         }
-        return generator.render_template(template_name="test.py.jinja2", output_name=os.path.basename(filename), resolver=self.resolver, **args)
+        output_name = os.path.join(self.output_dir, filename)
+        return self.generator.render_template(template_name="test.py.jinja2", output_name=output_name, resolver=self.resolver, **args)
 
-    def GenerateFromPath(self, schema, path):
+    def GenerateFromPath(self, schema, path, root=None):
         assert(self.resolver)
         class_name = self.resolver.py_class_name(path).split('.')[-1]
-        filename_base = self.resolver.py_filename(path)
-        return self.Generate(schema, class_name, filename_base)
+        filename_base = os.path.splitext(self.resolver.py_filename(path))[0]
+        return self.Generate(schema, root, class_name, filename_base)
 
     def GenerateTestFromPath(self, schema, root, path):
         assert(self.resolver)
         class_name = self.resolver.py_class_name(path)
         filename_base = self.resolver.py_filename(path)
-        return self.GenerateTest(schema, root, class_name, filename_base, path)
\ No newline at end of file
+        return self.GenerateTest(schema, root, class_name, filename_base, path)
+
+    def BatchArgs(self) -> dict:
+        return {
+            "output_dir": self.output_dir,
+            "resolver": self.resolver,
+            "template_cache_dir": self.template_cache_dir,
+            "example_strength": self.example_strength,
+        }
+
+    def GenerateForBatch(self, schema, root, path):
+        return str(self.GenerateFromPath(schema, path, root))
+
+    def GenerateAll(self, spec, paths=None, workers=None) -> dict:
+        """ Generates a python file for each of many schemas in `spec`, in parallel worker processes.
+        @param paths are the references to generate, defaulting to every schema in components/schemas.
+        @param workers is the number of processes to use; None for one per CPU.
+        @returns a dict mapping each path to the filename written for it.
+        """
+        if paths is None:
+            paths = batch.ComponentPaths(spec, getattr(self.resolver, 'uri', ''))
+        return batch.GenerateAll(self, spec, paths, workers)
@@ -4,18 +4,141 @@ from . import json_example as jsex
 import stringcase
 from . import schemawrappers
 import yaml
+import os
+import json
+import collections
 from copy import copy
 
 class TreeWalkerException(Exception):
     pass
 
+class DocumentCache(object):
+    """ Holds parsed documents keyed by absolute path.
+    An entry is only reused while the file's mtime and size are unchanged.  When more than
+    `max_documents` are held, the least recently used document is dropped.  `reloads` counts
+    the documents that were parsed again after they had been loaded once, because they
+    changed or had been dropped.
+    """
+
+    def __init__(self, max_documents=64):
+        self.max_documents = max_documents
+        self._entries = collections.OrderedDict()
+        self._loaded = set()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def stamp(self, path):
+        """ Returns the mtime and size of the file at `path`, which change when the file is written.
+        """
+        return self._stamp(os.path.abspath(path))
+
+    def get(self, path, load):
+        """ Returns the document at `path`, calling `load(path)` to parse it if it isn't cached or is stale.
+        """
+        key = os.path.abspath(path)
+        stamp = self._stamp(key)
+        if key in self._entries and self._entries[key][0] == stamp:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][1]
+        self.misses += 1
+        if key in self._loaded:
+            self.reloads += 1
+        doc = load(key)
+        self._loaded.add(key)
+        self._entries[key] = (stamp, doc)
+        self._entries.move_to_end(key)
+        while self.max_documents is not None and len(self._entries) > self.max_documents:
+            self._entries.popitem(last=False)
+        return doc
+
+    def clear(self):
+        self._entries.clear()
+        self._loaded.clear()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PointerIndex(object):
+    """ Maps every JSON pointer reachable in a document to its node, and each node back to the first pointer found for it.
+    The index is built on first use, so the document must not be modified after that.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self._nodes = None
+        self._pointers = None
+
+    @staticmethod
+    def escape(token) -> str:
+        return str(token).replace('~', '~0').replace('/', '~1')
+
+    @staticmethod
+    def normalize(pointer) -> str:
+        return "".join(["/"+p for p in pointer.split('/') if len(p) > 0])
+
+    def _build(self):
+        self._nodes = {}
+        self._pointers = {}
+        # Each entry carries the ids of its containers, so a node shared by YAML aliases is indexed under every
+        # path that reaches it, and only a node that contains itself stops the walk.
+        stack = [("", self.document, frozenset())]
+        while stack:
+            pointer, node, ancestors = stack.pop()
+            self._nodes[pointer] = node
+            if isinstance(node, (dict, list)):
+                if id(node) in ancestors:
+                    continue
+                if id(node) not in self._pointers:
+                    self._pointers[id(node)] = pointer
+                ancestors = ancestors | {id(node)}
+                children = node.items() if isinstance(node, dict) else enumerate(node)
+                for key, child in children:
+                    stack.append(("{}/{}".format(pointer, self.escape(key)), child, ancestors))
+
+    def lookup(self, pointer):
+        """ Returns the node at `pointer`, or raises KeyError.
+        """
+        if self._nodes is None:
+            self._build()
+        return self._nodes[self.normalize(pointer)]
+
+    def pointer_of(self, node):
+        """ Returns the pointer of a dict or list node in the document, or None if it isn't part of the document.
+        """
+        if self._pointers is None:
+            self._build()
+        return self._pointers.get(id(node), None)
+
+    def __contains__(self, pointer):
+        if self._nodes is None:
+            self._build()
+        return self.normalize(pointer) in self._nodes
+
+
 class SimpleResolver(cpp.ResolverBaseClass, pyschema.ResolverBaseClass, jsex.SchemaResolverBaseClass):
 
-    def __init__(self, uri, root=None):
+    def __init__(self, uri, root=None, max_cached_documents=64, use_libyaml=False):
         self.uri = uri
         self.root = root
         self.usings = []
         self.rootNs = []
+        self.document_cache = DocumentCache(max_cached_documents)
+        self.max_pointer_indexes = max_cached_documents
+        self._pointer_indexes = collections.OrderedDict()
+        self.yaml_loader = yaml.FullLoader
+        if use_libyaml:
+            self.yaml_loader = getattr(yaml, 'CFullLoader', yaml.FullLoader)
 
     def cpp_set_root_namespace(self, ns: list):
         self.rootNs = ns
@@ -104,26 +227,67 @@ class SimpleResolver(cpp.ResolverBaseClass, pyschema.ResolverBaseClass, jsex.Sch
         ref = self._get_reference_parts(reference)
         return "{type}_{name}.py".format(**ref)
 
+    def get_pointer_index(self, document) -> PointerIndex:
+        key = id(document)
+        index = self._pointer_indexes.get(key, None)
+        if index is None or index.document is not document:
+            index = PointerIndex(document)
+            self._pointer_indexes[key] = index
+        self._pointer_indexes.move_to_end(key)
+        while self.max_pointer_indexes is not None and len(self._pointer_indexes) > self.max_pointer_indexes:
+            self._pointer_indexes.popitem(last=False)
+        return index
+
+    def get_pointer(self, node, document=None):
+        """ Returns the JSON pointer of `node` within `document` (the root document by default),
+        or None if it isn't found there.  Wrapped schemas are looked up by the dict they were created from.
+        """
+        document = document if document is not None else self.root
+        if document is None:
+            return None
+        return self.get_pointer_index(document).pointer_of(getattr(node, 'source', node))
+
     def _walk_through_tree(self, tree, path) -> dict:
         assert(tree is not None), "No tree to walk through"
-        walker = tree
-        for p in [p for p in path.split('/') if len(p) > 0]:
-            if p not in walker:
-                treeTitle = 'info' in tree and 'title' in tree['info'] and tree['info']['title'] or 'UNKNOWN'
-                treeId = 'id' in tree and tree['id'] or treeTitle
-                raise TreeWalkerException("Could not resolve {} from '{}'".format(path, treeId))
-            walker = walker[p]
-        return walker
+        try:
+            return self.get_pointer_index(tree).lookup(path)
+        except KeyError:
+            treeTitle = 'info' in tree and 'title' in tree['info'] and tree['info']['title'] or 'UNKNOWN'
+            treeId = 'id' in tree and tree['id'] or treeTitle
+            raise TreeWalkerException("Could not resolve {} from '{}'".format(path, treeId))
+
+    def _load_document(self, path, encoding) -> dict:
+        with open(path, 'r') as fp:
+            if encoding == 'json':
+                return json.load(fp)
+            else:
+                return yaml.load(fp, Loader=self.yaml_loader)
 
     def get_document(self, uri, encoding=None) -> dict:
         if '#' in uri:
             uri = uri.split('#')[0]
-        with open(uri, 'r') as fp:
-            if encoding == 'json' or (encoding is None and 'json' in uri):
-                import json
-                return json.load(fp)
-            else:
-                return yaml.load(fp, Loader=yaml.FullLoader)
+        if encoding is None and 'json' in uri:
+            encoding = 'json'
+        reloads = self.document_cache.reloads
+        doc = self.document_cache.get(uri, lambda path: self._load_document(path, encoding))
+        if self.document_cache.reloads != reloads:
+            # Example counts memoized from the old document may refer to it by its id, which the new one could reuse.
+            schemawrappers.ClearExampleMemo(self)
+        return doc
+
+    def get_document_stamp(self, reference):
+        """ Returns a value that changes whenever the document that `reference` points into is changed,
+        or None for a reference into the root document.
+        """
+        uri = reference.split('#')[0]
+        if not uri:
+            return None
+        return self.document_cache.stamp(uri)
+
+    def clear_document_cache(self):
+        self.document_cache.clear()
+        self._pointer_indexes.clear()
+        schemawrappers.ClearExampleMemo(self)
 
     def _get_root(self, reference, root):
         parts = self._get_reference_parts(reference)
@@ -1,7 +1,10 @@
 import collections
 import random
+import weakref
 from copy import deepcopy
 
+from . import patterns
+
 def bitsNeededForNumber(num):
     bits = 0
     while num > 0:
@@ -15,26 +18,43 @@ def rightBitMask(bits):
     mask -= 1
     return mask
 
+def LibInclude(resolver, filename):
+    """ Returns the #include argument for a header that the LibraryGenerator writes.
+    """
+    libNs = resolver and resolver.cpp_get_lib_ns() or []
+    return '"{}"'.format("/".join(libNs + [filename]))
+
 class ExampleIndex(object):
+    """ Decides, bit by bit, the choices made while building one example.
+    Each choice point passes a `label` naming it, which a plain index ignores.
+    """
 
-    def __init__(self, index):
+    def __init__(self, index, references=()):
         self.index = index
         self.current = index
+        self.references = references
 
     def _full(self):
         return self.index == -1
 
-    def BooleanChoice(self):
+    def Descend(self, ref):
+        """ Returns the index to use for the schema at `ref`, continuing from this index's current bits.
+        """
+        subIndex = ExampleIndex(self.index, self.references + (ref,))
+        subIndex.current = self.current
+        return subIndex
+
+    def BooleanChoice(self, label=None):
         if self._full():
             return True
         choice = self.current & 0x01
         self.current = self.current >> 1
         return bool(choice)
 
-    def Choice(self, population):
-        return population[self.Number(len(population)-1)]
+    def Choice(self, population, label=None):
+        return population[self.Number(len(population)-1, label)]
 
-    def Number(self, maximum) -> int:
+    def Number(self, maximum, label=None) -> int:
         if self._full() or maximum == 0:
             return maximum
         bits = bitsNeededForNumber(maximum)
@@ -46,21 +66,73 @@ class ExampleIndex(object):
     def __repr__(self):
         return str(self.index)
 
+
+class ReferenceDepthException(RecursionError):
+    pass
+
+
+class ExampleMemo(object):
+    """ Remembers, for one resolver, the example counts of referenced schemas.
+    A reference back into itself counts as one combination.  When building an example, a reference
+    that is already nested inside itself `depth_limit` times gets the minimal example (index 0).  If
+    that still recurses past twice the limit, the schema has no finite example and
+    ReferenceDepthException is raised.
+    """
+
+    def __init__(self, depth_limit=8):
+        self.depth_limit = depth_limit
+        self.combos = {}
+        self.active = []
+        self.cuts = 0
+
+    def clear(self):
+        self.combos.clear()
+
+
+_example_memos = weakref.WeakKeyDictionary()
+
+def GetExampleMemo(resolver) -> ExampleMemo:
+    """ Returns the ExampleMemo used with `resolver`, for instance to change its depth_limit.
+    """
+    if resolver is None:
+        return ExampleMemo()
+    if resolver not in _example_memos:
+        _example_memos[resolver] = ExampleMemo()
+    return _example_memos[resolver]
+
+def ClearExampleMemo(resolver):
+    if resolver in _example_memos:
+        _example_memos[resolver].clear()
+
+
 class SchemaBase(collections.UserDict):
 
     def __init__(self, initialdata, root=None):
         super().__init__(initialdata)
+        self.source = initialdata
         self.root = root
 
     def CppIncludes(self, resolver):
         return {
             '"rapidjson/document.h"',
-            "<exception>"
+            "<exception>",
+            "<boost/optional.hpp>"
         }
 
     def Resolve(self, resolver):
         return self
 
+    def HoldsMembers(self, resolver) -> bool:
+        """ Whether the generated class is built from the members of a JSON object, and so knows which member names are its own.
+        """
+        return False
+
+    def HasView(self, resolver) -> bool:
+        """ Whether, with the views option, the generated class has a separate view class that refers to the JSON it was
+        read from.  Other classes don't hold any of the JSON's strings, so are their own views.
+        """
+        return False
+
     def GetTitle(self):
         if 'title' in self.data:
             return self.data['title']
@@ -78,6 +150,11 @@ class SchemaBase(collections.UserDict):
             combos = len(self.data['examples'])
         return combos
 
+    def ChoiceLabel(self, what):
+        """ Names one of this schema's example choice points, the same way for every wrapper of the same schema.
+        """
+        return (id(self.source), what)
+
     def AnExample(self, resolver, index):
         raise NotImplementedError
     
@@ -87,7 +164,7 @@ class SchemaBase(collections.UserDict):
         if 'example' in self.data:
             return self.data['example']
         if 'examples' in self.data:
-            return index.Choice(self.data['examples'])
+            return index.Choice(self.data['examples'], self.ChoiceLabel('examples'))
         if 'default' in self.data:
             return self.data['default']
         try:
@@ -96,10 +173,41 @@ class SchemaBase(collections.UserDict):
             except TypeError:
                 pass
             return self.AnExample(resolver, index)
+        except ReferenceDepthException:
+            raise
         except:
             print(f"Failed to get an example for {self.data} against {self.root['info']['title']}")
             raise
 
+    def Examples(self, resolver, indexes: list, required=None) -> list:
+        """ Returns what Example() would for each of `indexes`, walking the schema once for all of them.
+        """
+        if 'const' in self.data:
+            return [self.data['const'] for _ in indexes]
+        if 'example' in self.data:
+            return [self.data['example'] for _ in indexes]
+        if 'examples' in self.data:
+            return [index.Choice(self.data['examples']) for index in indexes]
+        if 'default' in self.data:
+            return [self.data['default'] for _ in indexes]
+        if len(indexes) == 0:
+            return []
+        return self.AnExamples(resolver, indexes, required)
+
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        return [self.Example(resolver, index, required) for index in indexes]
+
+    def _ExamplesBy(self, resolver, indexes, choices, options, required=None):
+        """ For each index, gets an example from the option it chose, batching the indexes that chose the same option.
+        """
+        rets = [None] * len(indexes)
+        for n, option in enumerate(options):
+            chosen = [i for i, c in enumerate(choices) if c == n]
+            if len(chosen) > 0:
+                for i, value in zip(chosen, option.Examples(resolver, [indexes[i] for i in chosen], required)):
+                    rets[i] = value
+        return rets
+
 class Reference(SchemaBase):
 
     def __init__(self, initialdata, root=None):
@@ -121,18 +229,78 @@ class Reference(SchemaBase):
             pass
         return resolution
 
+    def HoldsMembers(self, resolver) -> bool:
+        return self.Resolve(resolver).HoldsMembers(resolver)
+
+    def HasView(self, resolver) -> bool:
+        return self.Resolve(resolver).HasView(resolver)
+
     def SetPropertyRequired(self, propertyName):
         self.requiredProperties.add(propertyName)
 
+    def _MemoKey(self, resolver):
+        # The stamp of the referenced document makes an edited file miss the memo, so it is loaded again.
+        getStamp = getattr(resolver, 'get_document_stamp', None)
+        stamp = getStamp(self.data['$ref']) if getStamp is not None else None
+        return (self.data['$ref'], id(self.root), frozenset(self.requiredProperties), stamp)
+
     def GetExampleCombos(self, resolver) -> int:
-        return self.Resolve(resolver).GetExampleCombos(resolver)
+        memo = GetExampleMemo(resolver)
+        key = self._MemoKey(resolver)
+        if key in memo.combos:
+            return memo.combos[key]
+        if key in memo.active:
+            memo.cuts += 1
+            return 1
+        cuts = memo.cuts
+        memo.active.append(key)
+        try:
+            combos = self.Resolve(resolver).GetExampleCombos(resolver)
+        finally:
+            memo.active.pop()
+        # A count that was cut short by recursion depends on where it was entered, so it isn't kept.
+        if memo.cuts == cuts:
+            memo.combos[key] = combos
+        return combos
 
     def Example(self, resolver, index: ExampleIndex, required=None):
+        memo = GetExampleMemo(resolver)
+        ref = self.data['$ref']
+        depth = index.references.count(ref)
+        if depth >= memo.depth_limit:
+            if depth >= 2 * memo.depth_limit:
+                raise ReferenceDepthException(f"Example of {ref} is still nested in itself {depth} times")
+            if index.index != 0:
+                index = ExampleIndex(0, index.references)
+        subIndex = index.Descend(ref)
         try:
-            return self.Resolve(resolver).Example(resolver, index, required)
+            example = self.Resolve(resolver).Example(resolver, subIndex, required)
+        except ReferenceDepthException:
+            raise
         except:
             print(f"Trying to resolve {self.data['$ref']} against yaml root {self.root}")
             raise
+        index.current = subIndex.current
+        return example
+
+    def Examples(self, resolver, indexes: list, required=None) -> list:
+        memo = GetExampleMemo(resolver)
+        ref = self.data['$ref']
+        if len(indexes) == 0:
+            return []
+        pending = []
+        for index in indexes:
+            depth = index.references.count(ref)
+            if depth >= memo.depth_limit:
+                if depth >= 2 * memo.depth_limit:
+                    raise ReferenceDepthException(f"Example of {ref} is still nested in itself {depth} times")
+                if index.index != 0:
+                    index = ExampleIndex(0, index.references)
+            pending.append((index, index.Descend(ref)))
+        examples = self.Resolve(resolver).Examples(resolver, [p[1] for p in pending], required)
+        for index, subIndex in pending:
+            index.current = subIndex.current
+        return examples
 
 
 class ObjectSchema(SchemaBase):
@@ -146,16 +314,23 @@ class ObjectSchema(SchemaBase):
         self.requiredProperties = set()
         if 'required' in self.data:
             self.requiredProperties.update(self.data['required'])
+        self._propertySchemas = None
+        self._requiredLists = {}
 
     def SetPropertyRequired(self, propertyName):
         if 'properties' in self.data and propertyName in self.data['properties']:
-            self.requiredProperties.add(propertyName)
+            if propertyName not in self.requiredProperties:
+                self.requiredProperties.add(propertyName)
+                self._requiredLists.clear()
 
     def GetPropertySchemas(self):
-        props = {}
-        for n, p in self.data['properties'].items():
-            props[n] = SchemaFactory(p, self.root)
-        return props
+        """ Returns the wrapped property schemas, which are created on first use and then reused.
+        """
+        if self._propertySchemas is None:
+            self._propertySchemas = {}
+            for n, p in self.data['properties'].items():
+                self._propertySchemas[n] = SchemaFactory(p, self.root)
+        return self._propertySchemas
 
     def PropertyKeys(self):
         return [a for a in self.data['properties'].keys()]
@@ -163,6 +338,29 @@ class ObjectSchema(SchemaBase):
     def PropertyValues(self):
         return [a for a in self.data['properties'].values()]
 
+    def HoldsMembers(self, resolver) -> bool:
+        return True
+
+    def HasView(self, resolver) -> bool:
+        return True
+
+    def OptionalPropertyNames(self):
+        """ The names of the properties that generated objects hold as optional, which are those that aren't required,
+        either by this schema's `required` or by an allOf around it, in the order of the properties.  With the
+        compact_layout option, a property's index in this list is its bit in the object's presence bits.
+        """
+        return [propName for propName in self.data['properties'].keys() if propName not in self.requiredProperties]
+
+    def PropertyNamesByLength(self):
+        """ Groups the property names by their length in UTF-8, so generated code can find a member's
+        property by switching on the name's length and then comparing only names of that length.
+        @returns a list of (length, [property names]) pairs, sorted by length.
+        """
+        groups = {}
+        for propName in self.data['properties'].keys():
+            groups.setdefault(len(propName.encode('utf-8')), []).append(propName)
+        return sorted(groups.items())
+
     def __getitem__(self, key):
         if key == 'properties':
             return self.GetPropertySchemas()
@@ -171,29 +369,30 @@ class ObjectSchema(SchemaBase):
 
     def CppIncludes(self, resolver=None):
         incs = super().CppIncludes(resolver=resolver)
-        incs.update({"<boost/optional.hpp>"})
+        incs.update({"<boost/optional.hpp>", "<cstring>"})
         for _, ps in self.GetPropertySchemas().items():
             incs.update(ps.CppIncludes(resolver))
         return incs
 
+    def _SplitRequired(self, default_negates_required):
+        if default_negates_required not in self._requiredLists:
+            required = []
+            unrequired = []
+            for propName, propSchema in self.GetPropertySchemas().items():
+                if (propName in self.requiredProperties) and not (default_negates_required and 'default' in propSchema):
+                    required.append((propName, propSchema))
+                else:
+                    unrequired.append((propName, propSchema))
+            self._requiredLists[default_negates_required] = (required, unrequired)
+        return self._requiredLists[default_negates_required]
+
     # TODO: Need something that specifies that this is 'required' for init
     def RequiredList(self, default_negates_required=True):
-        theList = []
-        for propName, propSchema in self.data['properties'].items():
-            if (propName in self.requiredProperties) and not (default_negates_required and 'default' in propSchema):
-                theList.append((propName, SchemaFactory(propSchema, self.root)))
-        return theList
+        return list(self._SplitRequired(default_negates_required)[0])
 
     # TODO: Need something that specifies that this is 'required' for init
     def UnRequiredList(self, default_negates_required=True):
-        theList = []
-        for propName, propSchema in self.data['properties'].items():
-            schemaObject = SchemaFactory(propSchema, self.root)
-            if default_negates_required and 'default' in propSchema:
-                theList.append((propName, schemaObject))
-            elif propName not in self.requiredProperties:
-                theList.append((propName, schemaObject))
-        return theList
+        return list(self._SplitRequired(default_negates_required)[1])
 
     def GetExampleCombos(self, resolver) -> int:
         combos = 1
@@ -210,12 +409,28 @@ class ObjectSchema(SchemaBase):
         for name, item in self.RequiredList(default_negates_required=False):
             ret[name] = item.Example(resolver, index)
         for name, item in self.UnRequiredList(default_negates_required=False):
-            if index.BooleanChoice() or name in required:
+            if index.BooleanChoice(self.ChoiceLabel("property '{}'".format(name))) or name in required:
                 ret[name] = item.Example(resolver, index)
         return ret
 
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        if required is None:
+            required = []
+        rets = [{} for _ in indexes]
+        for name, item in self.RequiredList(default_negates_required=False):
+            for ret, value in zip(rets, item.Examples(resolver, indexes)):
+                ret[name] = value
+        for name, item in self.UnRequiredList(default_negates_required=False):
+            chosen = [i for i, index in enumerate(indexes) if index.BooleanChoice() or name in required]
+            for i, value in zip(chosen, item.Examples(resolver, [indexes[i] for i in chosen])):
+                rets[i][name] = value
+        return rets
+
 class StringSchema(SchemaBase):
 
+    def HasView(self, resolver) -> bool:
+        return self.data.get('format') != 'date-time'
+
     def CppIncludes(self, resolver=None):
         incs = super().CppIncludes(resolver=resolver)
         incs.update({"<string>", "<boost/functional/hash.hpp>"})
@@ -225,9 +440,20 @@ class StringSchema(SchemaBase):
             if self.data['format'] == 'uuid':
                 incs.update({"<boost/uuid/uuid.hpp>", "<boost/uuid/random_generator.hpp>", "<boost/uuid/uuid_io.hpp>"})
             elif self.data['format'] == 'date-time':
-                incs.update({"<boost/optional.hpp>", "<boost/date_time/posix_time/posix_time.hpp>", "<boost/algorithm/string/replace.hpp>"})
+                incs.update({"<boost/optional.hpp>", "<cstring>", "<boost/date_time/posix_time/posix_time.hpp>", LibInclude(resolver, "rfc3339.hpp")})
         return incs
 
+    def SimplePattern(self):
+        """ Returns the schema's pattern compiled to a patterns.SimplePattern, or None if there is no
+        pattern or it isn't simple enough.
+        """
+        if 'pattern' not in self.data:
+            return None
+        try:
+            return patterns.CompileSimplePattern(self.data['pattern'])
+        except patterns.NotSimplePatternException:
+            return None
+
     def AnExample(self, resolver, index: ExampleIndex):
         if 'format' in self.data:
             if self.data['format'] == 'uuid':
@@ -239,25 +465,78 @@ class StringSchema(SchemaBase):
         theString = ("string"*minLen)[:minLen]
         return theString
 
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        # The example doesn't depend on the index.
+        return [self.AnExample(resolver, indexes[0])] * len(indexes)
+
 
 class StringEnumSchema(StringSchema):
-    
+
+    def HasView(self, resolver) -> bool:
+        return False
+
+    def CppIncludes(self, resolver=None):
+        incs = super().CppIncludes(resolver=resolver)
+        incs.update({"<cstring>", "<stdexcept>"})
+        return incs
+
+    def EnumDispatch(self):
+        """ Plans how generated code finds the enum value of a string without comparing it to every value.
+        The values are grouped by their length in UTF-8, and a group of several values is split again on
+        the byte position that tells the most of them apart, so memcmp is left with few values to check.
+        @returns a list of (length, position, [(byte, [values])]) sorted by length and byte.  The position is
+            None, and the byte 0, for a group that isn't split.
+        """
+        byLength = {}
+        for value in self.data['enum']:
+            byLength.setdefault(len(value.encode('utf-8')), []).append(value)
+        plan = []
+        for length, values in sorted(byLength.items()):
+            if len(values) == 1:
+                plan.append((length, None, [(0, values)]))
+                continue
+            encoded = [v.encode('utf-8') for v in values]
+            position = max(range(length), key=lambda p: len(set([e[p] for e in encoded])))
+            byByte = {}
+            for value, e in zip(values, encoded):
+                byByte.setdefault(e[position], []).append(value)
+            plan.append((length, position, sorted(byByte.items())))
+        return plan
+
     def GetExampleCombos(self, resolver) -> int:
         if 'example' in self.data or 'examples' in self.data or 'default' in self.data:
             return super().GetExampleCombos(resolver)
         return len(self.data['enum'])
     
     def AnExample(self, resolver, index: ExampleIndex):
-        return index.Choice(self.data['enum'])
+        return index.Choice(self.data['enum'], self.ChoiceLabel('enum'))
+
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        return [index.Choice(self.data['enum']) for index in indexes]
 
 
 class NumberSchema(SchemaBase):
 
     def CppIncludes(self, resolver=None):
         incs = super().CppIncludes(resolver=resolver)
-        incs.update({"<boost/lexical_cast.hpp>", "<boost/functional/hash.hpp>"})
+        incs.update({"<limits>", "<boost/functional/hash.hpp>", LibInclude(resolver, "lexical.hpp")})
         return incs
 
+    def CppFormatLimits(self, resolver):
+        """ Returns C++ expressions for the least and greatest values that FromString accepts.
+        These are the limits of the C++ type (int or double), narrowed by the schema's `format`, such as 'uint8' or 'float'.
+        """
+        std = resolver.cpp_resolve_namespace(['std'])
+        fmt = self.data.get('format')
+        if self.data['type'] == 'integer':
+            limitType = {'int8': 'int8_t', 'uint8': 'uint8_t', 'int16': 'int16_t', 'uint16': 'uint16_t'}.get(fmt)
+            limitType = limitType and std + limitType or 'int'
+            minimum = fmt in ['uint8', 'uint16', 'uint32', 'uint64'] and '0' or '{}numeric_limits<{}>::min()'.format(std, limitType)
+        else:
+            limitType = fmt == 'float' and 'float' or 'double'
+            minimum = '-{}numeric_limits<{}>::max()'.format(std, limitType)
+        return minimum, '{}numeric_limits<{}>::max()'.format(std, limitType)
+
     def AnExample(self, resolver, index: ExampleIndex):
         for k in ['minimum', 'maximum']:
             if k in self.data:
@@ -268,8 +547,16 @@ class NumberSchema(SchemaBase):
             return self.data['exclusiveMaximum'] - (self.data['type'] == 'integer' and 1 or 0.000001)
         return self.data['type'] == 'integer' and 1 or 1.1
 
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        return [self.AnExample(resolver, indexes[0])] * len(indexes)
+
 class BooleanSchema(SchemaBase):
 
+    def CppIncludes(self, resolver=None):
+        incs = super().CppIncludes(resolver=resolver)
+        incs.add(LibInclude(resolver, "lexical.hpp"))
+        return incs
+
     def GetExampleCombos(self, resolver) -> int:
         combos = 2
         if 'example' in self.data or 'examples' in self.data or 'default' in self.data:
@@ -277,7 +564,10 @@ class BooleanSchema(SchemaBase):
         return combos
 
     def AnExample(self, resolver, index: ExampleIndex):
-        return index.Choice([True, False])
+        return index.Choice([True, False], self.ChoiceLabel('boolean'))
+
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        return [index.Choice([True, False]) for index in indexes]
 
 
 class NullSchema(SchemaBase):
@@ -290,19 +580,34 @@ class NullSchema(SchemaBase):
     def AnExample(self, resolver, index: ExampleIndex):
         return None
 
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        return [None] * len(indexes)
+
 class ArraySchema(SchemaBase):
-    
+
+    def __init__(self, initialdata, root=None):
+        super().__init__(initialdata, root)
+        self._itemSchema = None
+        self._tupleSchema = None
+
     def IsTupleSchema(self):
         return isinstance(self.data["items"], list)
 
+    def HasView(self, resolver) -> bool:
+        return True
+
     def NumberTupleItems(self):
         return len(self.data["items"])
 
     def GetTupleSchema(self):
-        return [ SchemaFactory(x, self.root) for x in self.data['items'] ]
+        if self._tupleSchema is None:
+            self._tupleSchema = [ SchemaFactory(x, self.root) for x in self.data['items'] ]
+        return self._tupleSchema
 
     def GetItemSchema(self):
-        return SchemaFactory(self.data['items'], self.root)
+        if self._itemSchema is None:
+            self._itemSchema = SchemaFactory(self.data['items'], self.root)
+        return self._itemSchema
 
     def CppIncludes(self, resolver=None):
         incs = super().CppIncludes(resolver=resolver)
@@ -323,10 +628,28 @@ class ArraySchema(SchemaBase):
         ret = []
         left = 'minItems' in self.data and int(self.data['minItems']) or 0
         right = 'maxItems' in self.data and int(self.data['maxItems']) or (left + 3)
-        for _ in range(0, left+index.Number(right-left)):
+        for _ in range(0, left+index.Number(right-left, self.ChoiceLabel('length'))):
             ret.append(self.GetItemSchema().Example(resolver, index))
+        return self._Unique(ret)
+
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        left = 'minItems' in self.data and int(self.data['minItems']) or 0
+        right = 'maxItems' in self.data and int(self.data['maxItems']) or (left + 3)
+        lengths = [left+index.Number(right-left) for index in indexes]
+        rets = [[] for _ in indexes]
+        for position in range(0, max(lengths)):
+            active = [i for i, length in enumerate(lengths) if length > position]
+            for i, value in zip(active, self.GetItemSchema().Examples(resolver, [indexes[i] for i in active])):
+                rets[i].append(value)
+        return [self._Unique(ret) for ret in rets]
+
+    def _Unique(self, ret):
         if 'uniqueItems' in self.data and self.data['uniqueItems']:
-            ret = list(set(ret))
+            unique = []
+            for item in ret:
+                if item not in unique:
+                    unique.append(item)
+            ret = unique
         return ret
 
 class CombinatorSchemaBase(SchemaBase):
@@ -358,6 +681,9 @@ class CombinatorSchemaBase(SchemaBase):
     def GetComponents(self):
         return self.components
 
+    def HoldsMembers(self, resolver) -> bool:
+        return any([c.HoldsMembers(resolver) for c in self.GetComponents()])
+
     def CppIncludes(self, resolver=None):
         incs = super().CppIncludes(resolver=resolver)
         for c in self.GetComponents():
@@ -370,6 +696,50 @@ class CombinatorSchemaBase(SchemaBase):
         return self.data[key]
 
 
+Discriminator = collections.namedtuple('Discriminator', ['property', 'values'])
+Discriminator.__doc__ = """ A property deciding a oneOf's option; `values` are (property value, oneOf index) pairs. """
+
+_JSON_TYPES = {
+    'integer': 'number',
+    'number': 'number',
+    'string': 'string',
+    'boolean': 'boolean',
+    'null': 'null',
+    'object': 'object',
+    'array': 'array',
+}
+
+def _ResolveFully(schema, root, resolver, depth=32):
+    """ Wraps a raw schema and follows references.  Returns None for schemas that can't be wrapped or resolved.
+    """
+    try:
+        wrapper = SchemaFactory(schema, root)
+        while isinstance(wrapper, Reference) and depth > 0:
+            wrapper = wrapper.Resolve(resolver)
+            depth -= 1
+    except Exception:
+        return None
+    if isinstance(wrapper, Reference):
+        return None
+    return wrapper
+
+def _JsonTypes(schema, root, resolver, depth=8):
+    wrapper = _ResolveFully(schema, root, resolver)
+    if wrapper is None or isinstance(wrapper, AlwaysValidSchema) or depth == 0:
+        return None
+    if isinstance(wrapper.data.get('type', None), str):
+        return {_JSON_TYPES[wrapper.data['type']]}
+    if isinstance(wrapper, (OneOfSchema, AnyOfSchema)):
+        types = set()
+        for s in wrapper.data[wrapper.name]:
+            componentTypes = _JsonTypes(s, wrapper.root, resolver, depth - 1)
+            if componentTypes is None:
+                return None
+            types.update(componentTypes)
+        return types
+    return None
+
+
 class OneOfSchema(CombinatorSchemaBase):
     
     def __init__(self, initialdata, root=None):
@@ -381,6 +751,10 @@ class OneOfSchema(CombinatorSchemaBase):
         incs.update({"<boost/variant.hpp>", "<boost/functional/hash.hpp>"})
         return incs
 
+    def HoldsMembers(self, resolver) -> bool:
+        # Each option is deserialized on its own, so checks its own members.
+        return False
+
     def GetCommonType(self, resolver):
         commonType = None
         for comp in self.GetComponents():
@@ -392,6 +766,64 @@ class OneOfSchema(CombinatorSchemaBase):
                     return None
         return commonType
 
+    def HeapOptions(self, resolver) -> list:
+        """ For each schema listed in oneOf, whether the compact_layout option keeps it on the heap, which it does for
+        objects and arrays, and for options whose JSON type can't be told from the schema.  This keeps a variant
+        about as small as its largest scalar option.
+        """
+        return [types is None or bool(types & {'object', 'array'}) for types in self.GetComponentJsonTypes(resolver)]
+
+    def GetComponentJsonTypes(self, resolver) -> list:
+        """ For each schema listed in oneOf, the set of JSON types ('object', 'array', 'string', 'number',
+        'boolean' or 'null') that a matching value can have, or None when that can't be told from the schema.
+        """
+        return [_JsonTypes(s, self.root, resolver) for s in self.data['oneOf']]
+
+    def GetDiscriminator(self, resolver):
+        """ Finds a property whose value alone decides which oneOf option a JSON object matches.
+        An OpenAPI `discriminator` is used if present.  Otherwise it is a property that every option
+        is an object with, and that has a different `const` or string `enum` in each.
+        @returns a Discriminator, or None if there isn't one.
+        """
+        options = [_ResolveFully(s, self.root, resolver) for s in self.data['oneOf']]
+        if isinstance(self.data.get('discriminator', None), dict) and 'propertyName' in self.data['discriminator']:
+            candidates = [self.data['discriminator']['propertyName']]
+        elif any([not isinstance(o, ObjectSchema) for o in options]):
+            return None
+        else:
+            candidates = sorted(set.intersection(*[set(o.data['properties'].keys()) for o in options]))
+        for propName in candidates:
+            values = []
+            for n, option in enumerate(options):
+                values.extend([(v, n) for v in self._DiscriminatorValues(propName, n, option, resolver)])
+            names = [v for v, _ in values]
+            if len(set([n for _, n in values])) == len(options) and len(set(names)) == len(names):
+                return Discriminator(propName, values)
+        return None
+
+    def _DiscriminatorValues(self, propName, n, option, resolver) -> list:
+        entry = self.data['oneOf'][n]
+        discriminator = self.data.get('discriminator', None)
+        if isinstance(discriminator, dict) and discriminator.get('propertyName', None) == propName and '$ref' in entry:
+            mapping = discriminator.get('mapping', {})
+            values = [v for v, ref in mapping.items() if ref == entry['$ref']]
+            if len(values) == 0 and entry['$ref'] not in mapping.values():
+                values = [entry['$ref'].split('/')[-1]]
+            return values
+        if not isinstance(option, ObjectSchema) or propName not in option.data['properties']:
+            return []
+        prop = _ResolveFully(option.data['properties'][propName], option.root, resolver)
+        if prop is None:
+            return []
+        values = []
+        if 'const' in prop.data:
+            values = [prop.data['const']]
+        elif 'enum' in prop.data:
+            values = list(prop.data['enum'])
+        if not all([isinstance(v, str) for v in values]):
+            return []
+        return values
+
     def GetExampleCombos(self, resolver) -> int:
         combos = 1
         if 'example' in self.data or 'examples' in self.data or 'default' in self.data:
@@ -405,10 +837,15 @@ class OneOfSchema(CombinatorSchemaBase):
         return combos
 
     def AnExample(self, resolver, index: ExampleIndex):
-        component = index.Choice(self.GetComponents())
+        component = index.Choice(self.GetComponents(), self.ChoiceLabel('oneOf'))
         ex = component.Example(resolver, index)
         return ex
 
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        components = self.GetComponents()
+        choices = [index.Number(len(components)-1) for index in indexes]
+        return self._ExamplesBy(resolver, indexes, choices, components)
+
 
 class AllOfSchema(CombinatorSchemaBase):
 
@@ -418,12 +855,23 @@ class AllOfSchema(CombinatorSchemaBase):
 
     def AnExample(self, resolver, index: ExampleIndex, required=None):
         ret = {}
+        requiredProperties = set(self.requiredProperties)
         if required is not None:
-            self.requiredProperties.update(required)
+            requiredProperties.update(required)
         for comp in self.GetComponents():
-            ret.update(comp.Example(resolver, index, self.requiredProperties))
+            ret.update(comp.Example(resolver, index, requiredProperties))
         return ret
 
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        rets = [{} for _ in indexes]
+        requiredProperties = set(self.requiredProperties)
+        if required is not None:
+            requiredProperties.update(required)
+        for comp in self.GetComponents():
+            for ret, value in zip(rets, comp.Examples(resolver, indexes, requiredProperties)):
+                ret.update(value)
+        return rets
+
 
 class AnyOfSchema(CombinatorSchemaBase):
 
@@ -441,18 +889,38 @@ class AnyOfSchema(CombinatorSchemaBase):
     
     def AnExample(self, resolver, index: ExampleIndex, required=None):
         ret = {}
+        requiredProperties = set(self.requiredProperties)
         if required is not None:
-            self.requiredProperties.update(required)
+            requiredProperties.update(required)
         gotOne = False
-        for comp in self.GetComponents():
-            if index.BooleanChoice():
+        for n, comp in enumerate(self.GetComponents()):
+            if index.BooleanChoice(self.ChoiceLabel('anyOf {}'.format(n))):
                 gotOne = True
-                ret.update(comp.Example(resolver, index, self.requiredProperties))
+                ret.update(comp.Example(resolver, index, requiredProperties))
         if not gotOne:
-            comp = index.Choice(self.GetComponents())
-            ret.update(comp.Example(resolver, index, self.requiredProperties))
+            comp = index.Choice(self.GetComponents(), self.ChoiceLabel('anyOf'))
+            ret.update(comp.Example(resolver, index, requiredProperties))
         return ret
 
+    def AnExamples(self, resolver, indexes: list, required=None) -> list:
+        rets = [{} for _ in indexes]
+        requiredProperties = set(self.requiredProperties)
+        if required is not None:
+            requiredProperties.update(required)
+        gotOne = [False] * len(indexes)
+        components = self.GetComponents()
+        for comp in components:
+            chosen = [i for i, index in enumerate(indexes) if index.BooleanChoice()]
+            for i, value in zip(chosen, comp.Examples(resolver, [indexes[i] for i in chosen], requiredProperties)):
+                gotOne[i] = True
+                rets[i].update(value)
+        missing = [i for i in range(0, len(indexes)) if not gotOne[i]]
+        choices = [indexes[i].Number(len(components)-1) for i in missing]
+        values = self._ExamplesBy(resolver, [indexes[i] for i in missing], choices, components, requiredProperties)
+        for i, value in zip(missing, values):
+            rets[i].update(value)
+        return rets
+
 class AlwaysValidSchema(collections.UserDict):
 
     def __init__(self, always:bool, root=None):
@@ -466,6 +934,9 @@ class AlwaysValidSchema(collections.UserDict):
     def Example(self, resolver, index: ExampleIndex, required=None):
         pass
 
+    def Examples(self, resolver, indexes: list, required=None) -> list:
+        return [None for _ in indexes]
+
 def SchemaFactory(schema, root=None):
     if isinstance(schema, bool):
         return AlwaysValidSchema(schema, root)
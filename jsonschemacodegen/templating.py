@@ -0,0 +1,35 @@
+import os
+import pathlib
+
+import jinja2
+from jacobsjinjatoo import templator
+
+from . import manifest
+
+
+class CodeTemplator(templator.CodeTemplator):
+    """ A CodeTemplator meant to be created once and reused for every rendered file.
+    Output names are given relative to the current directory (or as absolute paths), so a single
+    instance and its compiled templates can serve several output directories.  If `bytecode_cache_dir`
+    is given, compiled templates are also persisted there between runs.  Files are only rewritten
+    when their rendered content changes.
+    """
+
+    def __init__(self, template_package, bytecode_cache_dir=None):
+        super().__init__('.')
+        self.bytecode_cache = None
+        if bytecode_cache_dir is not None:
+            if not os.path.exists(bytecode_cache_dir):
+                os.makedirs(bytecode_cache_dir)
+            self.bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_cache_dir)
+        self.add_template_package(template_package)
+
+    def _get_jinja2_environment(self, force=False):
+        env = super()._get_jinja2_environment(force)
+        env.bytecode_cache = self.bytecode_cache
+        return env
+
+    def render_template(self, template_name, output_name, **kwargs):
+        template = self._get_jinja2_environment().get_template(template_name)
+        manifest.WriteIfChanged(output_name, template.render(kwargs))
+        return pathlib.Path(output_name)